@@ -3,9 +3,13 @@ import grpc
 from mergerd import mount_manager_pb2 as pb
 from mergerd import mount_manager_pb2_grpc as grpc_pb
 import argparse
+import functools
+import itertools
+import json
+import time
 
 
-def create_stub(addr, ca, cert, key):
+def load_credentials(ca, cert, key):
     with open(ca, "rb") as f:
         root_cert = f.read()
     with open(cert, "rb") as f:
@@ -18,12 +22,55 @@ def create_stub(addr, ca, cert, key):
         private_key=client_key,
         certificate_chain=client_cert,
     )
-    channel = grpc.secure_channel(addr, creds)
+    return creds
+
+
+def open_channel(addr, ca, cert, key):
+    return grpc.secure_channel(addr, load_credentials(ca, cert, key))
+
+
+class ChannelPool:
+    """由多个独立 channel 组成的连接池，轮询分发 RPC
+
+    单个 channel 只有一条 HTTP/2 连接，并发流数受 MAX_CONCURRENT_STREAMS 限制；
+    每个 channel 使用独立的 subchannel pool，保证各自建立单独的连接。
+    """
+
+    def __init__(self, addr, ca, cert, key, size=4):
+        creds = load_credentials(ca, cert, key)
+        self.channels = [
+            grpc.secure_channel(
+                addr,
+                creds,
+                options=[("grpc.use_local_subchannel_pool", 1), ("pool_id", i)],
+            )
+            for i in range(size)
+        ]
+        self._stubs = itertools.cycle(
+            [grpc_pb.MountManagerStub(ch) for ch in self.channels]
+        )
+
+    def get_stub(self):
+        """轮询返回下一个 channel 上的 stub"""
+        return next(self._stubs)
+
+    def close(self):
+        for ch in self.channels:
+            ch.close()
+
+
+@functools.lru_cache(maxsize=None)
+def create_pool(addr, ca, cert, key, size=4):
+    """同一进程内相同的连接参数复用同一个连接池，避免重复 TLS 握手"""
+    return ChannelPool(addr, ca, cert, key, size=size)
+
+
+def create_stub(addr, ca, cert, key):
     # optionally wait for connectivity
-    return grpc_pb.MountManagerStub(channel)
+    return create_pool(addr, ca, cert, key).get_stub()
 
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--addr", default="localhost:50051")
     parser.add_argument("--ca", default="./cert/ca.crt")
@@ -35,31 +82,71 @@ def main():
     p1.add_argument("--dest", required=True)
     p1.add_argument("--src", nargs="+", required=True)
     p1.add_argument("--force", action="store_true")
+    p1.add_argument("--background", action="store_true", help="后台挂载并等待结果")
+
+    p5 = sub.add_parser("batch-create")
+    p5.add_argument(
+        "--file",
+        required=True,
+        help="JSON 数组，每项为 {dest_path, branches, allow_force_unmount, options}",
+    )
 
     p2 = sub.add_parser("remove")
     p2.add_argument("--dest", required=True)
     p2.add_argument("--force", action="store_true")
+    p2.add_argument("--background", action="store_true", help="后台卸载并等待结果")
 
     p3 = sub.add_parser("list")
 
     p4 = sub.add_parser("get")
     p4.add_argument("--name", required=True)
+    return parser
 
-    args = parser.parse_args()
-    stub = create_stub(args.addr, args.ca, args.cert, args.key)
 
+def wait_job(stub, handle, max_delay=2.0):
+    """轮询后台任务直到结束并打印结果，间隔从 0.1 秒指数退避到 max_delay
+
+    使用一元的 GetMountJob 而不是 WatchMount 流，等待期间不占用服务端工作线程。
+    """
+    print("handle:", handle)
+    delay = 0.1
+    while True:
+        st = stub.GetMountJob(pb.MountJobRequest(handle=handle))
+        if st.done:
+            print("OK:", st.ok, "msg:", st.message)
+            return st
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def run(stub, args):
+    """在给定的 stub 上执行一条已解析的命令，未知命令返回 False"""
     if args.cmd == "create":
         req = pb.CreateMountRequest(
             dest_path=args.dest,
             branches=args.src,
             allow_force_unmount=args.force,
+            background=args.background,
         )
         resp = stub.CreateMount(req)
         print("OK:", resp.ok, "msg:", resp.message)
+        # GetMountJob 必须走同一个 stub：handle 只在接收任务的服务进程内有效
+        if resp.handle:
+            wait_job(stub, resp.handle)
+    elif args.cmd == "batch-create":
+        with open(args.file, "r", encoding="utf-8") as f:
+            items = [pb.CreateMountRequest(**item) for item in json.load(f)]
+        resp = stub.BatchCreateMount(pb.BatchCreateMountRequest(items=items))
+        for item, r in zip(items, resp.results):
+            print(item.dest_path, "OK:", r.ok, "msg:", r.message)
     elif args.cmd == "remove":
-        req = pb.RemoveMountRequest(dest_path=args.dest, force=args.force)
+        req = pb.RemoveMountRequest(
+            dest_path=args.dest, force=args.force, background=args.background
+        )
         resp = stub.RemoveMount(req)
         print("OK:", resp.ok, "msg:", resp.message)
+        if resp.handle:
+            wait_job(stub, resp.handle)
     elif args.cmd == "list":
         resp = stub.ListMounts(pb.ListMountsRequest())
         for e in resp.entries:
@@ -80,6 +167,36 @@ def main():
             print("Mounted:", e.mounted)
             print("Sources:", list(e.branches))
     else:
+        return False
+    return True
+
+
+def run_many(args_list):
+    """在同一个 channel 上依次执行多条命令，只做一次 TLS 握手
+
+    Parameters
+    ----------
+    args_list : list[argparse.Namespace]
+        build_parser() 解析得到的参数列表，连接参数以第一条为准
+    """
+    if not args_list:
+        return
+    first = args_list[0]
+    channel = open_channel(first.addr, first.ca, first.cert, first.key)
+    try:
+        grpc.channel_ready_future(channel).result(timeout=5)
+        stub = grpc_pb.MountManagerStub(channel)
+        for args in args_list:
+            run(stub, args)
+    finally:
+        channel.close()
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    stub = create_stub(args.addr, args.ca, args.cert, args.key)
+    if not run(stub, args):
         parser.print_help()
 
 
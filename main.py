@@ -8,10 +8,17 @@ if __name__ == "__main__":
     parser.add_argument("--server-cert", default="./cert/server.crt")
     parser.add_argument("--server-key", default="./cert/server.key")
     parser.add_argument("--ca-cert", default="./cert/ca.crt")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="服务进程数，默认读取环境变量 MERGERD_PROCESSES（1）",
+    )
     args = parser.parse_args()
     serve(
         listen_addr=args.listen,
         certfile=args.server_cert,
         keyfile=args.server_key,
         ca_cert=args.ca_cert,
+        processes=args.processes,
     )
@@ -0,0 +1,5 @@
+import os
+
+# 使用 C 实现的 upb protobuf 后端，大量 MountEntry 的构造和序列化远快于纯 Python 实现；
+# 必须在首次导入 protobuf 之前设置，显式配置的环境变量优先
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
@@ -1,11 +1,28 @@
 #!/usr/bin/env python3
 import os
+import pathlib
+import queue
 import sqlite3
+import re
+import select
+import shutil
 import subprocess
-import shlex
-import datetime
+import sys
+import contextvars
+import ctypes
+import functools
+import itertools
+import json
+import stat
 import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
 from concurrent import futures
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import NamedTuple
 
 from . import mount_manager_pb2 as pb
 from . import mount_manager_pb2_grpc as grpc_pb
@@ -13,12 +30,110 @@ from . import mount_manager_pb2_grpc as grpc_pb
 import grpc
 
 
-DB_LOCK = threading.Lock()
+# _WRITE_LOCK: 串行化本进程内的写操作（以及连接的打开/关闭），读操作不加锁；
+# 可重入，允许 db_transaction 嵌套调用 db_* 写函数
+_WRITE_LOCK = threading.RLock()
 
 
 # DB_PATH: sqlite3 数据库文件路径，记录挂载信息
 DB_PATH = os.getenv("DB_PATH", "./mergerd.db")
 
+# _STAT_POOL: 并发校验路径的线程池，路径校验以 stat 类系统调用为主
+_STAT_POOL = futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="stat")
+
+# _MOUNT_POOL: 执行后台挂载/卸载任务的线程池，挂载卡住时不占用 gRPC 工作线程
+_MOUNT_POOL = futures.ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="mount"
+)
+
+# MAX_PENDING_JOBS: 未完成的后台任务上限，超过时拒绝新任务，避免 _MOUNT_POOL 队列无限增长
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "256"))
+
+# _JOBS: 后台任务 handle -> Future，按提交顺序排列；只保存在本进程内
+_JOBS: "OrderedDict[str, futures.Future]" = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+
+# 外部命令的绝对路径，在导入时解析一次，避免每次执行时查找 PATH；
+# 找不到时保留命令名，执行时再报错
+_MERGERFS = shutil.which("mergerfs") or "mergerfs"
+_FUSERMOUNT = shutil.which("fusermount") or "fusermount"
+_UMOUNT = shutil.which("umount") or "umount"
+_MOUNT = shutil.which("mount") or "mount"
+
+# _CMD_ENV: 子进程的最小环境变量，LC_ALL=C 跳过子进程的 locale 加载
+_CMD_ENV = {"LC_ALL": "C", "PATH": os.environ.get("PATH", os.defpath)}
+
+# _MERGERFS_BASE: mergerfs 命令模板
+# mergerfs SRC1:SRC2:... mount_point -o defaults,allow_other,use_ino,ro[,<options>]
+# 索引 1、2 (源目录、挂载点) 在挂载时填充
+_MERGERFS_BASE = (
+    _MERGERFS,
+    None,
+    None,
+    "-o",
+    "defaults,allow_other,use_ino,ro",
+)
+
+# MOUNTINFO_PATH: 内核导出的当前进程挂载表
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+# MOUNTINFO_TTL: 挂载表快照的缓存时间（秒），轮询类请求在此时间内不重复读取
+MOUNTINFO_TTL = float(os.getenv("MOUNTINFO_TTL", "0.1"))
+
+# 固定的 SQL 语句，保持文本一致以命中连接内的预编译语句缓存
+SQL_UPSERT = """
+INSERT INTO mounts (dest_path, branches, mount_opts, created_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(dest_path) DO UPDATE SET
+    branches=excluded.branches,
+    mount_opts=excluded.mount_opts,
+    created_at=excluded.created_at
+"""
+SQL_GET_ALL = "SELECT dest_path, branches, mount_opts, created_at FROM mounts"
+SQL_GET = SQL_GET_ALL + " WHERE dest_path=?"
+# 前缀查询使用半开区间，可以走 dest_path 的唯一索引做范围扫描（LIKE 会全表扫描）
+SQL_GET_PREFIX = SQL_GET_ALL + " WHERE dest_path >= ? AND dest_path < ?"
+SQL_DEL = "DELETE FROM mounts WHERE dest_path=?"
+SQL_DEL_PREFIX = "DELETE FROM mounts WHERE dest_path >= ? AND dest_path < ?"
+
+
+@dataclass
+class ValidatedPath:
+    """validate_path_stat 的校验结果"""
+
+    path: str
+    """标准化后的真实路径"""
+    st: os.stat_result | None
+    """路径的 stat 结果，路径不存在时为 None"""
+
+
+def _normalize_path(path: str, base_dir: str | None = None) -> str:
+    """校验路径格式并解析为标准化的真实路径，不访问路径本身"""
+    path = path.strip()
+
+    if not path or not isinstance(path, str):
+        raise ValueError("路径不能为空，且必须是字符串")
+
+    if "\0" in path:
+        raise ValueError("路径包含非法的 null 字符 '\\0'")
+
+    if " " in path:
+        raise ValueError("路径不能包含空格")
+
+    if not path.startswith("/"):
+        raise ValueError(f"路径必须是绝对路径: {path}")
+
+    # 解析符号链接，得到标准化的真实路径
+    real_path = os.path.realpath(path)
+
+    # 如果指定了 base_dir，检查是否越界
+    if base_dir:
+        base_dir_real = os.path.realpath(os.path.normpath(base_dir))
+        if not os.path.commonpath([real_path, base_dir_real]) == base_dir_real:
+            raise ValueError(f"路径 {real_path} 不在允许的根目录 {base_dir_real} 内")
+
+    return real_path
+
 
 def validate_path(
     path: str, base_dir: str | None = None, must_exist: bool = False
@@ -57,50 +172,225 @@ def validate_path(
         路径非法时抛出
     FileNotFoundError
         must_exist 为 True 且路径不存在时抛出
+    NotADirectoryError
+        must_exist 为 True 且路径的某一级父目录不是目录 (ENOTDIR) 时抛出
     """
-    path = path.strip()
+    if must_exist:
+        return validate_path_stat(path, base_dir, must_exist=True).path
+    return _normalize_path(path, base_dir)
 
-    if not path or not isinstance(path, str):
-        raise ValueError("路径不能为空，且必须是字符串")
 
-    if "\0" in path:
-        raise ValueError("路径包含非法的 null 字符 '\\0'")
+def validate_path_stat(
+    path: str, base_dir: str | None = None, must_exist: bool = False
+) -> ValidatedPath:
+    """与 validate_path 相同的校验，同时返回路径的 stat 结果，避免调用方再次 stat
 
-    if " " in path:
-        raise ValueError("路径不能包含空格")
+    Parameters
+    ----------
+    path : str
+        待校验绝对路径
+    base_dir : str or None, optional
+        可选限制的根目录。如果提供，必须确保 path 在 base_dir 内。
+    must_exist : bool, optional
+        如果为 True，要求路径必须存在，否则抛出异常, by default False
 
-    if not path.startswith("/"):
-        raise ValueError(f"路径必须是绝对路径: {path}")
+    Returns
+    -------
+    ValidatedPath
+        标准化路径及其 stat 结果，路径不存在且 must_exist 为 False 时 st 为 None
 
-    # 标准化路径
-    norm_path = os.path.normpath(path)
+    Raises
+    ------
+    ValueError
+        路径非法时抛出
+    FileNotFoundError
+        must_exist 为 True 且路径不存在时抛出
+    NotADirectoryError
+        must_exist 为 True 且路径的某一级父目录不是目录 (ENOTDIR) 时抛出
+    """
+    real_path = _normalize_path(path, base_dir)
 
-    # 解析符号链接，得到真实路径
-    real_path = os.path.realpath(norm_path)
+    # 一次 stat 同时完成存在性检查和类型信息获取
+    st = None
+    try:
+        st = os.stat(real_path)
+    except NotADirectoryError:
+        if must_exist:
+            raise NotADirectoryError(f"路径的上级不是目录: {real_path}")
+    except OSError:
+        if must_exist:
+            raise FileNotFoundError(f"路径不存在: {real_path}")
 
-    # 如果指定了 base_dir，检查是否越界
-    if base_dir:
-        base_dir_real = os.path.realpath(os.path.normpath(base_dir))
-        if not os.path.commonpath([real_path, base_dir_real]) == base_dir_real:
-            raise ValueError(f"路径 {real_path} 不在允许的根目录 {base_dir_real} 内")
+    return ValidatedPath(real_path, st)
 
-    # 如果必须存在，则检查
-    if must_exist and not os.path.exists(real_path):
-        raise FileNotFoundError(f"路径不存在: {real_path}")
 
-    return real_path
+def is_mounted(path):
+    """检查 path 是否已挂载
+
+    使用 os.path.ismount，只需对 path 及其父目录各做一次 lstat。
+    同一文件系统内的 bind mount 无法由此识别，挂载点必须精确判断时使用 is_mounted_at。
+    """
+    return os.path.ismount(path)
+
+
+# _WRITER: 唯一的写连接，所有写操作在 _WRITE_LOCK 下通过它执行
+_WRITER: sqlite3.Connection | None = None
+# _READERS: 只读连接池，WAL 模式下读操作互不阻塞，也不会被写阻塞
+_READERS: queue.Queue | None = None
+# DB_READERS: 只读连接池大小
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+
+
+def _apply_pragmas(conn):
+    """设置连接级别的 PRAGMA"""
+    conn.execute("PRAGMA busy_timeout=30000")
+    # WAL 模式下 NORMAL 同步级别只在 checkpoint 时 fsync
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-8000")
+
+
+def _open_conn(readonly: bool = False) -> sqlite3.Connection:
+    """打开一个 autocommit 模式的长连接"""
+    # 长连接上固定的 SQL 文本会命中语句缓存，无需每次重新编译
+    if readonly:
+        uri = pathlib.Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=64,
+        )
+    else:
+        conn = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=64
+        )
+    _apply_pragmas(conn)
+    return conn
+
+
+def _writer() -> sqlite3.Connection:
+    """返回写连接，首次调用时打开"""
+    global _WRITER
+    if _WRITER is None:
+        with _WRITE_LOCK:
+            if _WRITER is None:
+                _WRITER = _open_conn()
+    return _WRITER
+
+
+@contextmanager
+def reader():
+    """从只读连接池借出一个连接，用完归还"""
+    global _READERS
+    if _READERS is None:
+        # 只读连接要求数据库文件已存在，先确保写连接已打开
+        _writer()
+        with _WRITE_LOCK:
+            if _READERS is None:
+                pool = queue.Queue()
+                for _ in range(DB_READERS):
+                    pool.put(_open_conn(readonly=True))
+                _READERS = pool
+    conn = _READERS.get()
+    try:
+        yield conn
+    finally:
+        _READERS.put(conn)
+
+
+def close_db():
+    """关闭所有数据库连接，下次访问时重新打开（fork 子进程之前调用）"""
+    global _WRITER, _READERS, _VIEW_CONN
+    with _WRITE_LOCK:
+        if _READERS is not None:
+            while not _READERS.empty():
+                _READERS.get_nowait().close()
+            _READERS = None
+        if _WRITER is not None:
+            _WRITER.close()
+            _WRITER = None
+    with _VIEW_LOCK:
+        if _VIEW_CONN is not None:
+            _VIEW_CONN.close()
+            _VIEW_CONN = None
+
+
+def _prefix_range(prefix: str) -> tuple[str, str]:
+    """返回匹配所有以 prefix 开头的字符串的半开区间 [lo, hi)"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+_loads = json.loads
+
+
+def _dump_branches(branches) -> str:
+    """branches 以 JSON 数组存储，路径中包含 ':' 也能正确还原"""
+    return json.dumps(list(branches), separators=(",", ":"))
+
+
+def _load_branches(raw: str | None) -> list[str]:
+    if not raw:
+        return []
+    if raw[0] == "[":
+        return _loads(raw)
+    # 兼容旧版本以 ':' 拼接存储的记录
+    return raw.split(":")
+
+
+@contextmanager
+def db_transaction():
+    """在一个事务中执行写操作，退出时统一提交（一次 fsync），异常时回滚
+
+    可以嵌套使用：内层直接加入外层事务，由最外层负责提交，
+    因此同一个 RPC 内的多次写入可以合并为一个事务。
+    """
+    with _WRITE_LOCK:
+        conn = _writer()
+        if conn.in_transaction:
+            yield conn
+            return
+        # 立即获取写锁，避免多进程并发写时 deferred 事务升级锁失败
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
 
 
-def is_mounted(path):
-    """检查 path 是否已挂载"""
-    result = subprocess.run(["mount"], capture_output=True, text=True)
-    return any(path in line for line in result.stdout.splitlines())
+def _row_to_dict(r) -> dict:
+    return {
+        "dest_path": r[0],
+        "branches": _load_branches(r[1]),
+        "mount_opts": r[2] or "",
+        "created_at": r[3],
+    }
+
+
+def _format_created_at(value: int | str | None) -> str:
+    """将数据库中的 created_at（纳秒时间戳）格式化为 ISO 8601 UTC 字符串
+
+    旧版本写入的 ISO 字符串原样返回。
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        if not value.isdigit():
+            return value
+        # 旧库中 created_at 列为 TEXT 亲和性，整数会以字符串形式存储
+        value = int(value)
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(value // 1_000_000_000))
 
 
 def init_db():
-    with DB_LOCK:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    with _WRITE_LOCK:
+        conn = _writer()
         cur = conn.cursor()
+        # WAL 模式持久化在数据库文件中，读写互不阻塞
+        cur.execute("PRAGMA journal_mode=WAL")
         cur.execute(
             """
         CREATE TABLE IF NOT EXISTS mounts (
@@ -108,12 +398,10 @@ def init_db():
             dest_path TEXT UNIQUE,
             branches TEXT,
             mount_opts TEXT,
-            created_at TEXT
+            created_at INTEGER
         );
         """
         )
-        conn.commit()
-        conn.close()
 
 
 def db_upsert_mount(dest_path, branches, mount_opts):
@@ -131,29 +419,38 @@ def db_upsert_mount(dest_path, branches, mount_opts):
     mount_opts : str
         mergerfs mount options
     """
-    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    with DB_LOCK:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    now = time.time_ns()
+    with db_transaction() as conn:
         cur = conn.cursor()
 
         cur.execute(
-            """
-            INSERT INTO mounts (dest_path, branches, mount_opts, created_at)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(dest_path) DO UPDATE SET
-                branches=excluded.branches,
-                mount_opts=excluded.mount_opts,
-                created_at=excluded.created_at
-            """,
+            SQL_UPSERT,
             (
                 os.path.normpath(dest_path),
-                ":".join(branches),
+                _dump_branches(branches),
                 mount_opts or "",
                 now,
             ),
         )
-        conn.commit()
-        conn.close()
+
+
+def db_upsert_mounts(rows):
+    """在同一个事务中批量 Upsert 挂载记录
+
+    Parameters
+    ----------
+    rows : list[tuple[str, list[str], str]]
+        (dest_path, branches, mount_opts) 列表
+    """
+    if not rows:
+        return
+    now = time.time_ns()
+    params = [
+        (os.path.normpath(dest_path), _dump_branches(branches), mount_opts or "", now)
+        for dest_path, branches, mount_opts in rows
+    ]
+    with db_transaction() as conn:
+        conn.executemany(SQL_UPSERT, params)
 
 
 def db_delete_mount(dest_path: str, recursive: bool = False):
@@ -167,35 +464,19 @@ def db_delete_mount(dest_path: str, recursive: bool = False):
         是否递归删除所有 dest_path 下的子路径, by default False
     """
     dest_path = os.path.normpath(dest_path)
-    with DB_LOCK:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    with db_transaction() as conn:
         cur = conn.cursor()
         if recursive:
-            cur.execute("DELETE FROM mounts WHERE dest_path like ?", (dest_path + "%",))
+            cur.execute(SQL_DEL_PREFIX, _prefix_range(dest_path))
         else:
-            cur.execute("DELETE FROM mounts WHERE dest_path=?", (dest_path,))
-        conn.commit()
-        conn.close()
+            cur.execute(SQL_DEL, (dest_path,))
 
 
 def db_get_all():
-    with DB_LOCK:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cur = conn.cursor()
-        cur.execute("SELECT dest_path, branches, mount_opts, created_at FROM mounts")
-        rows = cur.fetchall()
-        conn.close()
-        result = []
-        for r in rows:
-            result.append(
-                {
-                    "dest_path": r[0],
-                    "branches": r[1].split(":") if r[1] else [],
-                    "mount_opts": r[2] or "",
-                    "created_at": r[3],
-                }
-            )
-        return result
+    # WAL 模式下读操作不会被写阻塞，无需持有 _WRITE_LOCK
+    with reader() as conn:
+        rows = conn.execute(SQL_GET_ALL).fetchall()
+    return [_row_to_dict(r) for r in rows]
 
 
 def db_get(dest_path: str, recursive: bool = False) -> dict | list[dict] | None:
@@ -214,54 +495,36 @@ def db_get(dest_path: str, recursive: bool = False) -> dict | list[dict] | None:
     dict or list[dict] or None
         如果 recursive 为 False，返回单个 dict 或 None（未找到）；如果 recursive 为 True，返回所有匹配的 dict 列表或 []（未找到）
     """
-    with DB_LOCK:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cur = conn.cursor()
-
+    with reader() as conn:
         if recursive:
             # 查询 dest_path 下所有
-            cur.execute(
-                "SELECT dest_path, branches, mount_opts, created_at FROM mounts WHERE dest_path like ?",
-                (dest_path + "%",),
-            )
+            rows = conn.execute(SQL_GET_PREFIX, _prefix_range(dest_path)).fetchall()
         else:
             # 查询单条
-            cur.execute(
-                "SELECT dest_path, branches, mount_opts, created_at FROM mounts WHERE dest_path=?",
-                (dest_path,),
-            )
+            rows = conn.execute(SQL_GET, (dest_path,)).fetchall()
 
-        rows = cur.fetchall()
-        conn.close()
-
-        if not rows:
-            return None if recursive else []
-
-        result = []
-        for r in rows:
-            result.append(
-                {
-                    "dest_path": r[0],
-                    "branches": r[1].split(":") if r[2] else [],
-                    "mount_opts": r[2] or "",
-                    "created_at": r[3],
-                }
-            )
+    if not rows:
+        return None if recursive else []
 
-        # 如果原来查询单个字符串，返回单条 dict
-        if recursive:
-            return result
-        return result[0]
+    result = [_row_to_dict(r) for r in rows]
 
+    # 如果原来查询单个字符串，返回单条 dict
+    if recursive:
+        return result
+    return result[0]
 
-def run_cmd(cmd, check=True):
-    """Run a command and return the result"""
-    # cmd: list or string
-    if isinstance(cmd, str):
-        cmd = shlex.split(cmd)
-    proc = subprocess.run(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
+
+def run_cmd(cmd: list[str], check=True, text=True, capture=True):
+    """Run a command and return the result
+
+    capture=False discards stdout/stderr to /dev/null instead of reading and
+    decoding two pipes, for commands whose output is ignored.
+    """
+    if capture:
+        kwargs = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text)
+    else:
+        kwargs = dict(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    proc = subprocess.run(cmd, close_fds=True, env=_CMD_ENV, **kwargs)
     if check and proc.returncode != 0:
         raise RuntimeError(
             f"Command failed: {' '.join(cmd)}\nstdout: {proc.stdout}\nstderr: {proc.stderr}"
@@ -269,64 +532,385 @@ def run_cmd(cmd, check=True):
     return proc
 
 
+# umount2(2) flag, same as `umount -l` / `fusermount -uz`
+MNT_DETACH = 2
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+def lazy_umount(path: str):
+    """延迟卸载 path，等价于 fusermount -uz
+
+    优先直接调用 umount2(MNT_DETACH)，省去 fork+exec；
+    没有权限等原因失败时退回 fusermount -uz。
+    """
+    try:
+        if _libc.umount2(os.fsencode(path), MNT_DETACH) == 0:
+            return
+        run_cmd([_FUSERMOUNT, "-uz", path], check=False, capture=False)
+    finally:
+        invalidate_mountinfo()
+
+
+def _unescape_mount_field(field: bytes) -> str:
+    """还原 mountinfo 字段中的八进制转义（空格、制表符、换行、反斜杠）"""
+    if b"\\" in field:
+        field = re.sub(rb"\\([0-7]{3})", lambda m: bytes([int(m[1], 8)]), field)
+    return os.fsdecode(field)
+
+
+def _read_mount_table() -> bytes | None:
+    """一次性读取 /proc/self/mountinfo 的原始内容，procfs 不可用时返回 None"""
+    try:
+        with open(MOUNTINFO_PATH, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_mount_output() -> bytes:
+    """读取 mount(8) 的原始输出，仅在 procfs 不可用时作为后备方案"""
+    # 保持字节形式，不对整个输出做解码
+    return run_cmd([_MOUNT], check=True, text=False).stdout
+
+
+class MountInfo(NamedTuple):
+    """挂载表中单个挂载点的信息"""
+
+    source: str
+    fstype: str
+    options: str
+
+
+def _iter_mount_output():
+    """解析 mount(8) 的输出，产出 (mount_point, MountInfo, line)"""
+    for l in _read_mount_output().splitlines():
+        # parse like: /usr/bin/mergerfs on /tmp/data/name type fuse.mergerfs (rw,relatime,...)
+        src, sep, rest = l.partition(b" on ")
+        mp, sep2, rest = rest.partition(b" type ")
+        if not sep or not sep2:
+            continue
+        fs, _, opts = rest.partition(b" ")
+        yield os.fsdecode(mp), MountInfo(
+            os.fsdecode(src), os.fsdecode(fs), os.fsdecode(opts.strip(b"()"))
+        ), os.fsdecode(l)
+
+
+def _iter_mounts():
+    """逐条解析系统挂载表，产出 (mount_point, MountInfo, line)
+
+    优先读取 /proc/self/mountinfo，procfs 不可用时解析 mount(8) 的输出。
+    """
+    data = _read_mount_table()
+    if data is None:
+        yield from _iter_mount_output()
+        return
+    for raw in data.splitlines():
+        # 36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+        head, sep, tail = raw.partition(b" - ")
+        fields = head.split(b" ", 6)
+        if not sep or len(fields) < 6:
+            continue
+        fs, _, tail = tail.partition(b" ")
+        src, _, _ = tail.partition(b" ")
+        yield _unescape_mount_field(fields[4]), MountInfo(
+            _unescape_mount_field(src), os.fsdecode(fs), os.fsdecode(fields[5])
+        ), os.fsdecode(raw)
+
+
+def _read_mountinfo() -> dict[str, MountInfo]:
+    """读取一次系统挂载表，返回 {挂载点: MountInfo}
+
+    同一个 RPC 内可复用返回的快照，避免每次检查都重新读取挂载表；
+    同一挂载点上叠加的多次挂载，以最上层（最后出现）的为准。
+    """
+    return {mp: info for mp, info, _ in _iter_mounts()}
+
+
+# 挂载表快照缓存：(generation, deadline, mounts)
+# 本进程执行挂载/卸载后、或监听线程收到挂载表变化通知时递增 generation，使缓存立即失效
+_snap_gen = itertools.count()
+_snap_current_gen = next(_snap_gen)
+_snap: tuple[int, float, dict[str, MountInfo]] = (-1, 0.0, {})
+
+# 监听线程运行时，缓存只在挂载表变化时失效，不再受 MOUNTINFO_TTL 限制
+_mounts_watched = False
+
+
+# 单个 RPC 内的挂载表快照：[mounts or None]，由 _RpcMountsInterceptor 在每个 RPC 开始时设置；
+# 不在 RPC 内时为 None，不做请求级缓存
+_RPC_MOUNTS: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "rpc_mounts", default=None
+)
+
+
+def invalidate_mountinfo():
+    """使挂载表快照缓存失效，在挂载或卸载之后调用"""
+    global _snap_current_gen
+    _snap_current_gen = next(_snap_gen)
+    rpc_mounts = _RPC_MOUNTS.get()
+    if rpc_mounts is not None:
+        rpc_mounts[0] = None
+
+
+def cached_mountinfo() -> dict[str, MountInfo]:
+    """返回挂载表快照
+
+    同一个 RPC 内多次调用复用同一份快照（直到本 RPC 自己挂载或卸载）；
+    跨 RPC 时在 MOUNTINFO_TTL 秒内且未失效时复用上一次的读取结果。
+    """
+    global _snap
+    rpc_mounts = _RPC_MOUNTS.get()
+    if rpc_mounts is not None and rpc_mounts[0] is not None:
+        return rpc_mounts[0]
+    gen, deadline, mounts = _snap
+    now = time.monotonic()
+    if gen != _snap_current_gen or not (_mounts_watched or now < deadline):
+        # 读取期间若发生失效，generation 已变化，下次访问会重新读取
+        gen = _snap_current_gen
+        mounts = _read_mountinfo()
+        _snap = (gen, now + MOUNTINFO_TTL, mounts)
+    if rpc_mounts is not None:
+        rpc_mounts[0] = mounts
+    return mounts
+
+
+class _RpcMountsInterceptor(grpc.ServerInterceptor):
+    """为每个 unary RPC 建立独立的挂载表快照作用域"""
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+        behavior = handler.unary_unary
+
+        def unary_unary(request, context):
+            token = _RPC_MOUNTS.set([None])
+            try:
+                return behavior(request, context)
+            finally:
+                _RPC_MOUNTS.reset(token)
+
+        return grpc.unary_unary_rpc_method_handler(
+            unary_unary,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+
+def _watch_mountinfo():
+    """监听 /proc/self/mountinfo，挂载表每次变化时使快照缓存失效
+
+    内核在挂载命名空间发生变化时对已打开的 mountinfo 文件报告 POLLPRI|POLLERR。
+    """
+    global _mounts_watched
+    try:
+        f = open(MOUNTINFO_PATH, "rb")
+    except OSError:
+        # procfs 不可用，继续使用 MOUNTINFO_TTL 过期策略
+        return
+    with f:
+        poller = select.poll()
+        poller.register(f, select.POLLPRI | select.POLLERR)
+        _mounts_watched = True
+        # 监听开始之前的变化可能未被观察到，先失效一次
+        invalidate_mountinfo()
+        try:
+            while True:
+                poller.poll()
+                invalidate_mountinfo()
+        finally:
+            _mounts_watched = False
+
+
+def start_mountinfo_watcher():
+    """启动挂载表监听后台线程"""
+    threading.Thread(
+        target=_watch_mountinfo, name="mountinfo-watcher", daemon=True
+    ).start()
+
+
 def list_system_mounts():
     """List all system mounts"""
-    proc = run_cmd("mount", check=True)
-    # Return raw output lines
-    return proc.stdout.splitlines()
+    # Return raw mountinfo lines
+    return [line for _, _, line in _iter_mounts()]
+
+
+def is_mounted_at(mount_point, snapshot: dict[str, MountInfo] | None = None):
+    """Check if a mount point is mounted
+
+    Parameters
+    ----------
+    mount_point : str
+        挂载点（绝对路径）
+    snapshot : dict[str, MountInfo] or None, optional
+        由 _read_mountinfo 得到的挂载点快照，为 None 时重新读取挂载表
+    """
+    if snapshot is None:
+        snapshot = cached_mountinfo()
+    return mount_point in snapshot
 
 
-def is_mounted_at(mount_point):
-    """Check if a mount point is mounted"""
-    lines = list_system_mounts()
-    for l in lines:
-        # simple substring check: ' on /tmp/data/name '
-        if f" on {mount_point} " in l:
-            return True
-    return False
+def is_mergerfs_at(mount_point, snapshot: dict[str, MountInfo] | None = None):
+    """Check if the top-most mount at mount_point is a mergerfs mount
+
+    Parameters
+    ----------
+    mount_point : str
+        挂载点（绝对路径）
+    snapshot : dict[str, MountInfo] or None, optional
+        由 _read_mountinfo 得到的挂载表快照，为 None 时使用缓存的挂载表
+    """
+    if snapshot is None:
+        snapshot = cached_mountinfo()
+    info = snapshot.get(mount_point)
+    return info is not None and info.fstype == "fuse.mergerfs"
 
 
-def find_mergerfs_mounts():
+def find_mergerfs_mounts() -> dict[str, MountInfo]:
     """Find all mergerfs mounts"""
-    lines = list_system_mounts()
-    res = []
-    for l in lines:
-        if "mergerfs" in l:
-            # parse like: /usr/bin/mergerfs on /tmp/data/name type fuse.mergerfs (rw,relatime,...)
-            try:
-                parts = l.split()
-                src = parts[0]
-                on_idx = parts.index("on")
-                mp = parts[on_idx + 1]
-                res.append((src, mp, l))
-            except Exception:
-                continue
-    return res
+    return {
+        mp: info
+        for mp, info in cached_mountinfo().items()
+        if info.fstype == "fuse.mergerfs"
+    }
+
+
+# _VIEW: ListMounts 的内存视图 (data_version, rows, snapshot, response)，由 _VIEW_LOCK 保护
+_VIEW: tuple | None = None
+# _VIEW_CONN: 专用于内存视图的只读连接，PRAGMA data_version 在任何其他连接
+# （包括本进程的写连接和其他服务进程）提交写入后都会变化
+_VIEW_CONN: sqlite3.Connection | None = None
+_VIEW_LOCK = threading.Lock()
+
+
+def mounts_view(snapshot: dict[str, MountInfo]) -> pb.ListMountsResponse:
+    """返回全部挂载记录组成的 ListMountsResponse
+
+    数据库没有新的写入且挂载表快照未变化时，直接返回上次构造好的响应；
+    只有挂载表变化时复用已读取的记录，仅重新计算 mounted 标志。
+    返回的响应在多个 RPC 间共享，调用方不能修改。
+    """
+    global _VIEW, _VIEW_CONN
+    # 只读连接要求数据库文件已存在；在 _VIEW_LOCK 之外调用，避免与 close_db 锁顺序相反
+    _writer()
+    with _VIEW_LOCK:
+        if _VIEW_CONN is None:
+            _VIEW_CONN = _open_conn(readonly=True)
+            _VIEW = None
+        version = _VIEW_CONN.execute("PRAGMA data_version").fetchone()[0]
+        if _VIEW is not None and _VIEW[0] == version:
+            _, rows, snap, resp = _VIEW
+            if snap is snapshot:
+                return resp
+        else:
+            rows = [
+                dict(d, created_at=_format_created_at(d["created_at"]))
+                for d in map(_row_to_dict, _VIEW_CONN.execute(SQL_GET_ALL))
+            ]
+
+        resp = pb.ListMountsResponse()
+        # build entries in place inside the response, no intermediate messages to copy
+        add = resp.entries.add
+        for d in rows:
+            add(mounted=d["dest_path"] in snapshot, **d)
+        _VIEW = (version, rows, snapshot, resp)
+        return resp
+
+
+def _submit_job(fn, *args) -> str | None:
+    """把任务提交到 _MOUNT_POOL，返回任务 handle
+
+    未完成的任务达到 MAX_PENDING_JOBS 时不提交，返回 None。
+    已完成的任务保留到总数超过 MAX_PENDING_JOBS 后才按提交顺序清除，供 WatchMount 查询。
+    """
+    with _JOBS_LOCK:
+        pending = sum(1 for f in _JOBS.values() if not f.done())
+        if pending >= MAX_PENDING_JOBS:
+            return None
+        for handle in [h for h, f in _JOBS.items() if f.done()]:
+            if len(_JOBS) < MAX_PENDING_JOBS:
+                break
+            del _JOBS[handle]
+        handle = uuid.uuid4().hex
+        _JOBS[handle] = _MOUNT_POOL.submit(fn, *args)
+    return handle
+
+
+def _get_job(handle: str) -> futures.Future | None:
+    with _JOBS_LOCK:
+        return _JOBS.get(handle)
+
+
+def _job_status(handle: str) -> pb.MountJobStatus:
+    """返回后台任务的当前状态，不等待任务结束"""
+    fut = _get_job(handle)
+    if fut is None:
+        # handles live in the process that accepted the job
+        return pb.MountJobStatus(
+            handle=handle, done=True, ok=False, message="unknown handle"
+        )
+    if not fut.done():
+        return pb.MountJobStatus(handle=handle, done=False, message="pending")
+    exc = fut.exception()
+    if exc is not None:
+        return pb.MountJobStatus(
+            handle=handle, done=True, ok=False, message=f"job failed: {exc}"
+        )
+    res = fut.result()
+    return pb.MountJobStatus(handle=handle, done=True, ok=res.ok, message=res.message)
 
 
 class MountManagerServicer(grpc_pb.MountManagerServicer):
-    def CreateMount(self, request: pb.CreateMountRequest, context):
+    def _validate(self, request: pb.CreateMountRequest):
+        """校验挂载请求中的目标路径和源目录
+
+        Returns
+        -------
+        tuple[ValidatedPath, list[str]] or pb.CreateMountResponse
+            成功返回 (dest, branches)，失败返回错误响应
+        """
         try:
-            dest_path = validate_path(request.dest_path.strip())
+            dest = validate_path_stat(request.dest_path.strip())
         except:
             return pb.CreateMountResponse(
                 ok=False, message="dest_path is not a valid absolute path"
             )
+        dest_path = dest.path
 
-        if os.path.exists(dest_path) and not os.path.isdir(dest_path):
+        # one stat instead of os.path.exists + os.path.isdir
+        if dest.st is not None and not stat.S_ISDIR(dest.st.st_mode):
             return pb.CreateMountResponse(
                 ok=False, message=f"{dest_path} exists and is not a directory"
             )
 
+        # validate branches concurrently, wall time is bounded by the slowest stat
+        pending = [
+            (s, _STAT_POOL.submit(validate_path_stat, s, must_exist=True))
+            for s in request.branches
+        ]
         branches = []
-        for s in request.branches:
-            try:
-                branches.append(validate_path(s, must_exist=True))
-            except FileNotFoundError:
+        for s, fut in pending:
+            exc = fut.exception()
+            if exc is None:
+                res = fut.result()
+                # must_exist=True guarantees a stat result
+                assert res.st is not None
+                # reuse the stat result instead of a second os.path.isdir
+                if not stat.S_ISDIR(res.st.st_mode):
+                    return pb.CreateMountResponse(
+                        ok=False, message=f"branches {s} is not a directory"
+                    )
+                branches.append(res.path)
+            elif isinstance(exc, NotADirectoryError):
+                return pb.CreateMountResponse(
+                    ok=False, message=f"branches {s} has a non-directory parent"
+                )
+            elif isinstance(exc, FileNotFoundError):
                 return pb.CreateMountResponse(
                     ok=False, message=f"branches {s} does not exist"
                 )
-            except Exception:
+            else:
                 return pb.CreateMountResponse(
                     ok=False, message=f"branches {s} is not a valid absolute path"
                 )
@@ -336,23 +920,58 @@ class MountManagerServicer(grpc_pb.MountManagerServicer):
                 ok=False, message="at least one branches required"
             )
 
+        return dest, branches
+
+    def _mount(
+        self,
+        request: pb.CreateMountRequest,
+        snapshot: dict[str, MountInfo],
+        validated: tuple[ValidatedPath, list[str]] | None = None,
+    ):
+        """校验参数并执行 mergerfs 挂载，不校验挂载结果也不写数据库
+
+        Parameters
+        ----------
+        request : pb.CreateMountRequest
+            挂载请求
+        snapshot : dict[str, MountInfo]
+            挂载前读取的挂载点快照
+        validated : tuple[ValidatedPath, list[str]] or None, optional
+            _validate 的结果，为 None 时在此校验, by default None
+
+        Returns
+        -------
+        tuple[str, list[str], str] or pb.CreateMountResponse
+            成功返回 (dest_path, branches, mount_opts)，失败返回错误响应
+        """
+        if validated is None:
+            validated = self._validate(request)
+            if isinstance(validated, pb.CreateMountResponse):
+                return validated
+        dest, branches = validated
+        dest_path = dest.path
+
         allow_force = request.allow_force_unmount
         options = request.options or ""
 
-        # ensure branches dirs exist
-        for s in branches:
-            if not os.path.isdir(s):
+        if dest.st is None:
+            try:
+                os.makedirs(dest_path, exist_ok=True)
+            except OSError as e:
                 return pb.CreateMountResponse(
-                    ok=False, message=f"branches {s} does not exist"
+                    ok=False, message=f"cannot create {dest_path}: {e}"
                 )
 
-        os.makedirs(dest_path, exist_ok=True)
+        # produce mergerfs command from the template
+        mergerfs, _, _, opt_flag, mount_opts = _MERGERFS_BASE
+        if options:
+            mount_opts = f"{mount_opts},{options}"
 
         # check for duplicate names in DB
         existing = db_get(dest_path)
         if existing:
             # verify actual mount status
-            if is_mounted_at(dest_path):
+            if is_mounted_at(dest_path, snapshot):
                 if not allow_force:
                     return pb.CreateMountResponse(
                         ok=False,
@@ -360,34 +979,88 @@ class MountManagerServicer(grpc_pb.MountManagerServicer):
                     )
                 # else try to fusermount -uz then continue
                 try:
-                    run_cmd(["fusermount", "-uz", dest_path], check=False)
+                    lazy_umount(dest_path)
                 except Exception as e:
                     # we ignore non-zero here and continue to regular mount attempt
                     pass
 
-        # produce mergerfs command
-        # mergerfs SRC1:SRC2:... mount_point -o defaults,allow_other,use_ino,<options>
-        src_spec = ":".join(branches)
-        mount_opts = "defaults,allow_other,use_ino,ro"
-        if options:
-            mount_opts += "," + options
-
-        cmd = ["/usr/bin/mergerfs", src_spec, dest_path, "-o", mount_opts]
+        cmd = [mergerfs, ":".join(branches), dest_path, opt_flag, mount_opts]
         try:
             run_cmd(cmd, check=True)
         except Exception as e:
             return pb.CreateMountResponse(ok=False, message=f"mount failed: {e}")
+        finally:
+            invalidate_mountinfo()
 
-        # verify mount shows up
-        if not is_mounted_at(dest_path):
+        return dest_path, branches, mount_opts
+
+    def CreateMount(self, request: pb.CreateMountRequest, context):
+        validated = self._validate(request)
+        if isinstance(validated, pb.CreateMountResponse):
+            return validated
+        if request.background:
+            # arguments are checked synchronously, the mount itself may stall on FUSE init
+            handle = _submit_job(self._create_mount, request, validated)
+            if handle is None:
+                return pb.CreateMountResponse(ok=False, message="too many pending jobs")
+            return pb.CreateMountResponse(ok=True, message="scheduled", handle=handle)
+        return self._create_mount(request, validated)
+
+    def _create_mount(self, request: pb.CreateMountRequest, validated):
+        res = self._mount(request, cached_mountinfo(), validated=validated)
+        if isinstance(res, pb.CreateMountResponse):
+            return res
+        dest_path, branches, mount_opts = res
+
+        # verify a mergerfs mount shows up, not just any mount
+        if not is_mergerfs_at(dest_path):
             return pb.CreateMountResponse(
                 ok=False, message="mount succeeded but not visible in mount table"
             )
 
-        # store in DB
+        # store in DB only after the mount is verified, one write transaction
         db_upsert_mount(dest_path, branches, mount_opts)
         return pb.CreateMountResponse(ok=True, message="mounted")
 
+    def BatchCreateMount(self, request: pb.BatchCreateMountRequest, context):
+        snapshot = cached_mountinfo()
+        results = []
+        for item in request.items:
+            if item.background:
+                results.append(
+                    pb.CreateMountResponse(
+                        ok=False, message="background is not supported in batch"
+                    )
+                )
+                continue
+            # one failing item must not abort the RPC, earlier items are already mounted
+            try:
+                results.append(self._mount(item, snapshot))
+            except Exception as e:
+                results.append(pb.CreateMountResponse(ok=False, message=f"{e}"))
+
+        # verify all mounts with one fresh snapshot
+        snapshot = cached_mountinfo()
+        responses = []
+        rows = []
+        for res in results:
+            if isinstance(res, pb.CreateMountResponse):
+                responses.append(res)
+            elif not is_mergerfs_at(res[0], snapshot):
+                responses.append(
+                    pb.CreateMountResponse(
+                        ok=False,
+                        message="mount succeeded but not visible in mount table",
+                    )
+                )
+            else:
+                rows.append(res)
+                responses.append(pb.CreateMountResponse(ok=True, message="mounted"))
+
+        # store all records in one transaction
+        db_upsert_mounts(rows)
+        return pb.BatchCreateMountResponse(results=responses)
+
     def RemoveMount(self, request: pb.RemoveMountRequest, context):
         dest_path = request.dest_path.strip()
         recursive = request.recursive
@@ -401,17 +1074,27 @@ class MountManagerServicer(grpc_pb.MountManagerServicer):
                 return pb.RemoveMountResponse(
                     ok=False, message=f"{dest_path} not found"
                 )
+        if request.background:
+            handle = _submit_job(self._unmount, dest_path, force)
+            if handle is None:
+                return pb.RemoveMountResponse(ok=False, message="too many pending jobs")
+            return pb.RemoveMountResponse(ok=True, message="scheduled", handle=handle)
+        return self._unmount(dest_path, force)
+
+    def _unmount(self, dest_path: str, force: bool):
         # try normal umount first
         try:
-            run_cmd(["umount", dest_path], check=False)
+            run_cmd([_UMOUNT, dest_path], check=False, capture=False)
         except Exception:
             pass
+        finally:
+            invalidate_mountinfo()
 
         # if still mounted and force, try fusermount -uz
         if is_mounted_at(dest_path):
             if force:
                 try:
-                    run_cmd(["fusermount", "-uz", dest_path], check=False)
+                    lazy_umount(dest_path)
                 except Exception as e:
                     return pb.RemoveMountResponse(
                         ok=False, message=f"fusermount failed: {e}"
@@ -433,20 +1116,8 @@ class MountManagerServicer(grpc_pb.MountManagerServicer):
         return pb.RemoveMountResponse(ok=True, message="unmounted and removed from DB")
 
     def ListMounts(self, request: pb.ListMountsRequest, context):
-        entries = []
-        db_entries = db_get_all()
-        # also cross-check with system mounts
-        for d in db_entries:
-            mounted = is_mounted_at(d["dest_path"])
-            me = pb.MountEntry(
-                dest_path=d["dest_path"],
-                branches=d["branches"],
-                mounted=mounted,
-                mount_opts=d["mount_opts"],
-                created_at=d["created_at"],
-            )
-            entries.append(me)
-        return pb.ListMountsResponse(entries=entries)
+        # cross-check with system mounts, served from the in-memory view
+        return mounts_view(cached_mountinfo())
 
     def GetMount(self, request: pb.GetMountRequest, context):
         name = request.dest_path.strip()
@@ -459,40 +1130,145 @@ class MountManagerServicer(grpc_pb.MountManagerServicer):
             branches=rec["branches"],
             mounted=mounted,
             mount_opts=rec["mount_opts"],
-            created_at=rec["created_at"],
+            created_at=_format_created_at(rec["created_at"]),
         )
         return pb.GetMountResponse(found=True, entry=me)
 
+    def GetMountJob(self, request: pb.MountJobRequest, context):
+        return _job_status(request.handle)
+
+    def WatchMount(self, request: pb.MountJobRequest, context):
+        # holds a worker thread until the job finishes, GetMountJob polling does not
+        handle = request.handle
+        fut = _get_job(handle)
+        if fut is not None and not fut.done():
+            yield _job_status(handle)
+            # wake up periodically so a cancelled watch releases its worker thread
+            while not fut.done():
+                futures.wait([fut], timeout=1)
+                if not context.is_active():
+                    return
+        yield _job_status(handle)
+
+
+def _read_file(path: str) -> bytes:
+    """按 fstat 得到的大小一次性读取整个文件，绕过 Python 的缓冲 IO 层"""
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # 多读 1 字节以确认已到文件末尾
+            chunk = os.read(fd, size + 1)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_creds(
+    certfile: str, keyfile: str, ca_cert: str
+) -> tuple[bytes, bytes, bytes]:
+    """读取 mTLS 证书、私钥和 CA，同一组文件只读取一次
+
+    返回原始字节而不是 grpc.ssl_server_credentials：gRPC 对象不能跨 fork 使用，
+    多进程模式下由父进程读取一次，子进程继承字节后各自创建 credentials。
 
-def serve(
-    listen_addr="0.0.0.0:50051",
-    certfile="server.crt",
-    keyfile="server.key",
-    ca_cert="ca.crt",
-):
-    init_db()
+    Returns
+    -------
+    tuple[bytes, bytes, bytes]
+        (server_cert, server_key, ca)
+    """
+    return _read_file(certfile), _read_file(keyfile), _read_file(ca_cert)
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+
+def _run_server(listen_addr, creds: tuple[bytes, bytes, bytes]):
+    """在当前进程中启动 gRPC 服务并阻塞，直到服务终止"""
+    start_mountinfo_watcher()
+
+    # 超过 maximum_concurrent_rpcs 的请求直接返回 RESOURCE_EXHAUSTED，而不是无限排队
+    # RPC 大部分时间在等待子进程和磁盘 IO，线程数按 IO 密集型负载设置
+    workers = int(os.getenv("MERGERD_WORKERS", str(max(32, (os.cpu_count() or 1) * 4))))
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=workers),
+        options=[("grpc.so_reuseport", 1), ("grpc.max_concurrent_streams", 256)],
+        maximum_concurrent_rpcs=workers * 2,
+        interceptors=[_RpcMountsInterceptor()],
+    )
     grpc_pb.add_MountManagerServicer_to_server(MountManagerServicer(), server)
 
     # mTLS server credentials
-    with open(certfile, "rb") as f:
-        server_cert = f.read()
-    with open(keyfile, "rb") as f:
-        server_key = f.read()
-    with open(ca_cert, "rb") as f:
-        ca = f.read()
-
+    server_cert, server_key, ca = creds
     server_credentials = grpc.ssl_server_credentials(
         [(server_key, server_cert)], root_certificates=ca, require_client_auth=True
     )
-    host, port = listen_addr.split(":")
     server.add_secure_port(listen_addr, server_credentials)
-    print(f"gRPC MountManager listening on {listen_addr} with mTLS")
+    print(f"[{os.getpid()}] gRPC MountManager listening on {listen_addr} with mTLS")
     server.start()
     server.wait_for_termination()
 
 
+def serve(
+    listen_addr="0.0.0.0:50051",
+    certfile="server.crt",
+    keyfile="server.key",
+    ca_cert="ca.crt",
+    processes: int | None = None,
+):
+    """启动 gRPC 服务
+
+    Parameters
+    ----------
+    processes : int or None, optional
+        服务进程数，为 None 时读取环境变量 MERGERD_PROCESSES（默认 1）。
+        大于 1 时 fork 出多个子进程，通过 SO_REUSEPORT 监听同一地址，绕开 GIL；
+        各进程通过 SQLite（WAL + BEGIN IMMEDIATE）共享挂载记录。
+    """
+    init_db()
+
+    creds = _load_creds(certfile, keyfile, ca_cert)
+
+    if processes is None:
+        processes = int(os.getenv("MERGERD_PROCESSES", "1"))
+    if processes <= 1:
+        _run_server(listen_addr, creds)
+        return
+
+    # gRPC 对象和 SQLite 连接都不能跨 fork 使用：fork 之前关闭数据库连接，
+    # 且父进程不创建任何 gRPC 对象
+    close_db()
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            # os._exit 跳过了解释器的异常处理，必须自行打印异常并返回非零退出码
+            code = 0
+            try:
+                _run_server(listen_addr, creds)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        children.append(pid)
+
+    failed = 0
+    for pid in children:
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        if code != 0:
+            print(f"worker {pid} exited with {code}", file=sys.stderr)
+            failed += 1
+    if failed:
+        # 非零退出码让 systemd 的 Restart=on-failure 生效
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -501,10 +1277,17 @@ if __name__ == "__main__":
     parser.add_argument("--server-cert", default="server.crt")
     parser.add_argument("--server-key", default="server.key")
     parser.add_argument("--ca-cert", default="ca.crt")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="服务进程数，默认读取环境变量 MERGERD_PROCESSES（1）",
+    )
     args = parser.parse_args()
     serve(
         listen_addr=args.listen,
         certfile=args.server_cert,
         keyfile=args.server_key,
         ca_cert=args.ca_cert,
+        processes=args.processes,
     )